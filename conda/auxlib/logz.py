@@ -169,3 +169,19 @@ def stringify(obj, content_max_len=0):
         return "\n".join(builder)
     except Exception as e:
         log.exception(e)
+
+
+class LazyStringify:
+    """
+    Defer stringify() until a log record is actually formatted, e.g.
+    ``log.debug("%s", LazyStringify(response, content_max_len=256))``.
+    """
+
+    __slots__ = ("obj", "content_max_len")
+
+    def __init__(self, obj, content_max_len=0):
+        self.obj = obj
+        self.content_max_len = content_max_len
+
+    def __str__(self):
+        return stringify(self.obj, content_max_len=self.content_max_len) or ""
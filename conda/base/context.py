@@ -366,6 +366,8 @@ class Context(Configuration):
         PrimitiveParameter(None, element_type=(bool, NoneType)),
         aliases=("use_only_tar_bz2",),
     )
+    repodata_use_zst = ParameterLoader(PrimitiveParameter(True))
+    repodata_use_http2 = ParameterLoader(PrimitiveParameter(False))
 
     always_softlink = ParameterLoader(PrimitiveParameter(False), aliases=("softlink",))
     always_copy = ParameterLoader(PrimitiveParameter(False), aliases=("copy",))
@@ -1099,6 +1101,8 @@ class Context(Configuration):
                 "repodata_fns",
                 "use_only_tar_bz2",
                 "repodata_threads",
+                "repodata_use_zst",
+                "repodata_use_http2",
                 "fetch_threads",
                 "experimental",
             ),
@@ -1602,6 +1606,22 @@ class Context(Configuration):
                 defaults to None, which uses the default ThreadPoolExecutor behavior.
                 """
             ),
+            repodata_use_http2=dals(
+                """
+                Download repodata over HTTP/2 when the `httpx` and `h2` packages
+                are installed, sharing one connection per host between all
+                subdirs fetched in parallel. Not used when proxy servers are
+                configured.
+                """
+            ),
+            repodata_use_zst=dals(
+                """
+                Download the smaller, zstd-compressed `repodata.json.zst` when
+                the channel provides it and the `zstandard` package is
+                installed, falling back to `repodata.json` otherwise. Set to
+                false to always download `repodata.json`.
+                """
+            ),
             report_errors=dals(
                 """
                 Opt in, or opt out, of automatic error reporting to core maintainers. Error
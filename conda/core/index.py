@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: BSD-3-Clause
 import platform
 import sys
+from functools import partial
 from itertools import chain
 from logging import getLogger
 
@@ -11,7 +12,7 @@ except ImportError:  # pragma: no cover
     from .._vendor.boltons.setutils import IndexedSet
 
 from ..base.context import context
-from ..common.io import ThreadLimitedThreadPoolExecutor, time_recorder
+from ..common.io import DummyExecutor, ThreadLimitedThreadPoolExecutor, time_recorder
 from ..deprecations import deprecated
 from ..exceptions import ChannelNotAllowed, InvalidSpec, PluginError
 from ..gateways.logging import initialize_logging
@@ -21,7 +22,7 @@ from ..models.match_spec import MatchSpec
 from ..models.records import EMPTY_LINK, PackageCacheRecord, PackageRecord, PrefixRecord
 from .package_cache_data import PackageCacheData
 from .prefix_data import PrefixData
-from .subdir_data import SubdirData, make_feature_record
+from .subdir_data import SubdirData, create_cache_dir, make_feature_record
 
 log = getLogger(__name__)
 
@@ -92,11 +93,21 @@ def fetch_index(
 ):
     log.debug("channel_urls=" + repr(channel_urls))
     index = {}
-    with ThreadLimitedThreadPoolExecutor() as executor:
-        subdir_instantiator = lambda url: SubdirData(
-            Channel(url), repodata_fn=repodata_fn
+    # ensure that this is not called by threaded code
+    create_cache_dir()
+    Executor = (
+        DummyExecutor
+        if context.debug or context.repodata_threads == 1
+        else partial(
+            ThreadLimitedThreadPoolExecutor, max_workers=context.repodata_threads
         )
-        for f in executor.map(subdir_instantiator, channel_urls):
+    )
+    with Executor() as executor:
+        # fetch and parse repodata in the worker threads, not while iterating
+        subdir_loader = lambda url: SubdirData(
+            Channel(url), repodata_fn=repodata_fn
+        ).load()
+        for f in executor.map(subdir_loader, channel_urls):
             index.update((rec, rec) for rec in f.iter_records())
     return index
 
@@ -7,6 +7,7 @@ import pickle
 import re
 import warnings
 from collections import UserList, defaultdict
+from collections.abc import Mapping
 from contextlib import closing
 from errno import EACCES, ENODEV, EPERM, EROFS
 from functools import partial
@@ -33,6 +34,7 @@ from conda.gateways.repodata import (
     RepoInterface,
     Response304ContentUnchanged,
     cache_fn_url,
+    repodata_json_loads,
 )
 
 from .. import CondaError
@@ -73,6 +75,28 @@ def get_repo_interface() -> type[RepoInterface]:
                 f"Is the required jsonpatch package installed?  {e}"
             )
 
+    if "sharded" in context.experimental:
+        try:
+            from conda.gateways.repodata.shards import ShardedRepoInterface
+
+            return ShardedRepoInterface
+        except ImportError as e:  # pragma: no cover
+            warnings.warn(
+                "Could not load the configured sharded repo interface. "
+                f"Are the required msgpack and zstandard packages installed?  {e}"
+            )
+
+    if context.repodata_use_http2:
+        try:
+            from conda.gateways.repodata.http2 import CondaRepoInterfaceH2
+
+            return CondaRepoInterfaceH2
+        except ImportError as e:  # pragma: no cover
+            warnings.warn(
+                "Could not load the HTTP/2 repo interface. "
+                f"Are the required httpx and h2 packages installed?  {e}"
+            )
+
     return CondaRepoInterface
 
 
@@ -387,9 +411,10 @@ class SubdirData(metaclass=SubdirDataType):
                     raise  # is UnavailableInvalidChannel subclass
                 # the surrounding try/except/else will cache "{}"
                 raw_repodata_str = None
-            except RepodataOnDisk:
+            except RepodataOnDisk as e:
                 # used as a sentinel, not the raised exception object
                 raw_repodata_str = RepodataOnDisk
+                state_saved = e.state_saved
 
         except UnavailableInvalidChannel:
             if self.repodata_fn != REPODATA_FN:
@@ -416,19 +441,21 @@ class SubdirData(metaclass=SubdirDataType):
                 if raw_repodata_str is RepodataOnDisk:
                     # this is handled very similar to a 304. Can the cases be merged?
                     # we may need to read_bytes() and compare a hash to the state, instead.
-                    # XXX use self._repo_cache.load() or replace after passing temp path to jlap
                     raw_repodata_str = self.cache_path_json.read_text()
-                    cache.state["size"] = len(raw_repodata_str)  # type: ignore
-                    stat = self.cache_path_json.stat()
-                    mtime_ns = stat.st_mtime_ns
-                    cache.state["mtime_ns"] = mtime_ns  # type: ignore
-                    cache.refresh()
+                    if not state_saved:
+                        stat = self.cache_path_json.stat()
+                        cache.state["size"] = stat.st_size  # type: ignore
+                        mtime_ns = stat.st_mtime_ns
+                        cache.state["mtime_ns"] = mtime_ns  # type: ignore
+                        cache.refresh()
+                elif isinstance(raw_repodata_str, Mapping):
+                    # e.g. sharded repodata, with every shard already fetched;
+                    # cache as a plain repodata.json
+                    raw_repodata_str = json.dumps(dict(raw_repodata_str))
+                    cache.save(raw_repodata_str)
                 elif isinstance(raw_repodata_str, (str, type(None))):
-                    # XXX skip this if self._repo already wrote the data
-                    # Can we pass this information in state or with a sentinel/special exception?
                     cache.save(raw_repodata_str or "{}")
                 else:  # pragma: no cover
-                    # it can be a dict?
                     assert False, f"Unreachable {raw_repodata_str}"
             except OSError as e:
                 if e.errno in (EACCES, EPERM, EROFS):
@@ -553,7 +580,7 @@ class SubdirData(metaclass=SubdirDataType):
         state: RepodataState | None = None,
     ):
         """State contains information that was previously in-band in raw_repodata_str."""
-        json_obj = json.loads(raw_repodata_str or "{}")
+        json_obj = repodata_json_loads(raw_repodata_str or "{}")
         return self._process_raw_repodata(json_obj, state=state)
 
     def _process_raw_repodata(self, repodata, state: RepodataState | None = None):
@@ -743,6 +770,9 @@ def fetch_repodata_remote_request(url, etag, mod_stamp, repodata_fn=REPODATA_FN)
             raise  # is UnavailableInvalidChannel subclass
         # the surrounding try/except/else will cache "{}"
         raw_repodata_str = None
+    except RepodataOnDisk:
+        # downloaded straight into the cache
+        raw_repodata_str = subdir.cache_path_json.read_text()
 
     return raw_repodata_str
 
@@ -3,12 +3,12 @@
 import hashlib
 import tempfile
 import warnings
-from logging import DEBUG, getLogger
+from logging import getLogger
 from os.path import basename, exists, join
 
 from ... import CondaError
 from ...auxlib.ish import dals
-from ...auxlib.logz import stringify
+from ...auxlib.logz import LazyStringify
 from ...base.context import context
 from ...common.io import time_recorder
 from ...exceptions import (
@@ -56,8 +56,7 @@ def download(
         timeout = context.remote_connect_timeout_secs, context.remote_read_timeout_secs
         session = CondaSession()
         resp = session.get(url, stream=True, proxies=session.proxies, timeout=timeout)
-        if log.isEnabledFor(DEBUG):
-            log.debug(stringify(resp, content_max_len=256))
+        log.debug("%s", LazyStringify(resp, content_max_len=256))
         resp.raise_for_status()
 
         content_length = int(resp.headers.get("Content-Length", 0))
@@ -217,8 +216,7 @@ def download_text(url):
         response = session.get(
             url, stream=True, proxies=session.proxies, timeout=timeout
         )
-        if log.isEnabledFor(DEBUG):
-            log.debug(stringify(response, content_max_len=256))
+        log.debug("%s", LazyStringify(response, content_max_len=256))
         response.raise_for_status()
     except RequestsProxyError:
         raise ProxyError()  # see #3962
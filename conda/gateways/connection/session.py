@@ -31,6 +31,9 @@ from .adapters.s3 import S3Adapter
 
 log = getLogger(__name__)
 RETRIES = 3
+# keep-alive connection pools kept per session (one per host); enough for the
+# channel hosts and mirrors of a typical configuration
+POOL_CONNECTIONS = 32
 
 
 CONDA_SESSION_SCHEMES = frozenset(
@@ -102,7 +105,9 @@ class CondaSession(Session, metaclass=CondaSessionType):
                 status_forcelist=[413, 429, 500, 503],
                 raise_on_status=False,
             )
-            http_adapter = HTTPAdapter(max_retries=retry)
+            http_adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS, max_retries=retry
+            )
             self.mount("http://", http_adapter)
             self.mount("https://", http_adapter)
             self.mount("ftp://", FTPAdapter())
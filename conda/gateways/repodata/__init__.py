@@ -4,21 +4,26 @@ from __future__ import annotations
 
 import abc
 import datetime
+import functools
 import hashlib
 import json
 import logging
 import os
 import pathlib
 import re
+import threading
 import time
 import warnings
-from collections import UserDict
-from contextlib import contextmanager
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future
+from contextlib import closing, contextmanager
+from email.utils import format_datetime, parsedate_to_datetime
+from errno import EACCES, EPERM, EROFS
 from os.path import dirname
 from pathlib import Path
 from typing import Any
 
-from conda.auxlib.logz import stringify
+from conda.auxlib.logz import LazyStringify
 from conda.base.constants import CONDA_HOMEPAGE_URL, REPODATA_FN
 from conda.base.context import context
 from conda.common.url import join_url, maybe_unquote
@@ -27,6 +32,7 @@ from conda.exceptions import (
     CondaDependencyError,
     CondaHTTPError,
     CondaSSLError,
+    NotWritableError,
     ProxyError,
     UnavailableInvalidChannel,
 )
@@ -45,6 +51,16 @@ from conda.models.channel import Channel
 
 from .lock import lock
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
 log = logging.getLogger(__name__)
 stderrlog = logging.getLogger("conda.stderrlog")
 
@@ -53,6 +69,12 @@ stderrlog = logging.getLogger("conda.stderrlog")
 # amonut of time.
 CHECK_ALTERNATE_FORMAT_INTERVAL = datetime.timedelta(days=7)
 
+# CondaRepoInterface.repodata() calls in progress, keyed by url, filename and
+# cache path; concurrent callers wait for the first one instead of downloading
+# the same file again.
+_INFLIGHT: dict[tuple, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
 
 class RepodataIsEmpty(UnavailableInvalidChannel):
     """
@@ -65,17 +87,25 @@ class RepodataOnDisk(Exception):
     """
     Indicate that RepoInterface.repodata() successfully wrote repodata to disk,
     instead of returning a string.
+
+    If state_saved, .state.json was written together with cache_path_json;
+    otherwise the caller must record its new mtime and size.
     """
 
+    def __init__(self, state_saved: bool = False):
+        super().__init__()
+        self.state_saved = state_saved
+
 
 class RepoInterface(abc.ABC):
     # TODO: Support async operations
     # TODO: Support progress bars
-    def repodata(self, state: dict) -> str:
+    def repodata(self, state: dict) -> str | Mapping | None:
         """
         Given a mutable state dictionary with information about the cache,
-        return repodata.json (or current_repodata.json) as a str. This function
-        also updates state, which is expected to be saved by the caller.
+        return repodata.json (or current_repodata.json) as a str, or as an
+        already-parsed, repodata.json-like Mapping. This function also updates
+        state, which is expected to be saved by the caller.
         """
         ...
 
@@ -93,16 +123,65 @@ class CondaRepoInterface(RepoInterface):
     #: Filename of the repodata file; defaults to value of conda.base.constants.REPODATA_FN
     _repodata_fn: str
 
-    def __init__(self, url: str, repodata_fn: str | None, **kwargs) -> None:
+    #: Cached repodata.json and .state.json, if known; enable incremental .jlap updates
+    _cache_path_json: Path | None
+    _cache_path_state: Path | None
+
+    def __init__(
+        self,
+        url: str,
+        repodata_fn: str | None,
+        cache_path_json: Path | str | None = None,
+        cache_path_state: Path | str | None = None,
+        **kwargs,
+    ) -> None:
         log.debug("Using CondaRepoInterface")
         self._url = url
         self._repodata_fn = repodata_fn or REPODATA_FN
+        self._cache_path_json = Path(cache_path_json) if cache_path_json else None
+        self._cache_path_state = Path(cache_path_state) if cache_path_state else None
 
     def repodata(self, state: RepodataState) -> str | None:
+        key = (self._url, self._repodata_fn, self._cache_path_json)
+        with _INFLIGHT_LOCK:
+            future = _INFLIGHT.get(key)
+            leader = future is None
+            if leader:
+                future = _INFLIGHT[key] = Future()
+
+        if not leader:
+            log.debug("Waiting for concurrent fetch of %s", join_url(*key[:2]))
+            json_str, error, fields = future.result()
+            state.clear()
+            state.update(fields)
+            if error:
+                raise error  # e.g. Response304ContentUnchanged or RepodataOnDisk
+            return json_str
+
+        try:
+            json_str = self._repodata(state)
+        except BaseException as e:
+            future.set_result((None, e, dict(state)))
+            raise
+        else:
+            future.set_result((json_str, None, dict(state)))
+        finally:
+            with _INFLIGHT_LOCK:
+                del _INFLIGHT[key]
+        return json_str
+
+    def _repodata(self, state: RepodataState) -> str | None:
         if not context.ssl_verify:
             warnings.simplefilter("ignore", InsecureRequestWarning)
 
-        session = CondaSession()
+        if self._use_jlap(state):
+            # patch the cached repodata.json; raises RepodataOnDisk or
+            # Response304ContentUnchanged, or JlapFullDownload if patches
+            # won't do and we should download it below
+            try:
+                return self._jlap_interface().repodata(state)
+            except _jlap_fetch().JlapFullDownload:
+                pass
 
         headers = {}
         etag = state.etag
@@ -110,44 +189,261 @@ class CondaRepoInterface(RepoInterface):
         if etag:
             headers["If-None-Match"] = str(etag)
         if last_modified:
+            # fall back to the header as received if it can't be parsed
+            last_modified = _http_date(last_modified) or last_modified
             headers["If-Modified-Since"] = str(last_modified)
         filename = self._repodata_fn
 
         url = join_url(self._url, filename)
 
+        use_zst = self._use_zst(state)
+
         with conda_http_errors(self._url, filename):
-            timeout = (
-                context.remote_connect_timeout_secs,
-                context.remote_read_timeout_secs,
+            response: Response | None = None
+            if use_zst:
+                response = self._get(url + ".zst", headers)
+                if response.status_code in (403, 404):
+                    # fall back to uncompressed repodata; check again after
+                    # CHECK_ALTERNATE_FORMAT_INTERVAL
+                    _release(response)
+                    response = None
+                    use_zst = False
+                    state.set_has_format("zst", False)
+            if response is None:
+                response = self._get(url, headers)
+
+        with closing(response):
+            with conda_http_errors(self._url, filename):
+                # don't consume the streamed body
+                log.debug("%s", LazyStringify(response, content_max_len=0))
+                if response.status_code >= 300:
+                    _release(response)
+                response.raise_for_status()
+                if use_zst:
+                    state.set_has_format("zst", True)
+
+            if response.status_code == 304:
+                # should we save cache-control to state here to put another n
+                # seconds on the "make a remote request" clock and/or touch cache
+                # mtime
+                raise Response304ContentUnchanged()
+
+            jlap_fetch = _jlap_fetch()
+            hasher = None
+            if jlap_fetch and state.should_check_format("jlap"):
+                # hash of the upstream file lets the next fetch apply .jlap patches
+                # instead of downloading everything again
+                hasher = jlap_fetch.hash()
+
+            json_str = None
+            temp_path = None
+            with conda_http_errors(self._url, filename):
+                chunks = _iter_content(response, use_zst)
+                if self._cache_path_json:
+                    temp_path = self._write_cache(chunks, hasher)
+                else:
+                    content = b"".join(chunks)
+                    if hasher:
+                        hasher.update(content)
+                    # repodata is always UTF-8; response.text would guess the
+                    # encoding with chardet when Content-Type has no charset
+                    json_str = content.decode("utf-8", errors="replace")
+
+        try:
+            # We no longer add these tags to the large `resp.content` json
+            saved_fields = {"_url": self._url}
+            _add_http_value_to_dict(response, "Etag", saved_fields, "_etag")
+            _add_http_value_to_dict(response, "Last-Modified", saved_fields, "_mod")
+            _add_http_value_to_dict(
+                response, "Cache-Control", saved_fields, "_cache_control"
             )
-            response: Response = session.get(
-                url, headers=headers, proxies=session.proxies, timeout=timeout
+            # remember which alternate formats are available across the reset
+            saved_fields.update(
+                (key, value) for key, value in state.items() if key.startswith("has_")
             )
-            if log.isEnabledFor(logging.DEBUG):
-                log.debug(stringify(response, content_max_len=256))
-            response.raise_for_status()
-
-        if response.status_code == 304:
-            # should we save cache-control to state here to put another n
-            # seconds on the "make a remote request" clock and/or touch cache
-            # mtime
-            raise Response304ContentUnchanged()
-
-        json_str = response.text
-
-        # We no longer add these tags to the large `resp.content` json
-        saved_fields = {"_url": self._url}
-        _add_http_value_to_dict(response, "Etag", saved_fields, "_etag")
-        _add_http_value_to_dict(response, "Last-Modified", saved_fields, "_mod")
-        _add_http_value_to_dict(
-            response, "Cache-Control", saved_fields, "_cache_control"
-        )
+            if hasher:
+                saved_fields[jlap_fetch.NOMINAL_HASH] = hasher.hexdigest()
+
+            state.clear()
+            state.update(saved_fields)
 
-        state.clear()
-        state.update(saved_fields)
+            if temp_path:
+                self._replace_cache(temp_path, state)
+        finally:
+            if temp_path:
+                _unlink(temp_path)
+
+        if json_str is None:
+            # Indicate that subdir_data mustn't rewrite cache_path_json
+            raise RepodataOnDisk(state_saved=True)
 
         return json_str
 
+    def _get(self, url: str, headers: dict[str, str]) -> Response:
+        """Start a streamed GET request; subclasses may use another transport."""
+        session = CondaSession()
+        timeout = (
+            context.remote_connect_timeout_secs,
+            context.remote_read_timeout_secs,
+        )
+        return session.get(
+            url, headers=headers, proxies=session.proxies, timeout=timeout, stream=True
+        )
+
+    def _write_cache(self, chunks: Iterable[bytes], hasher=None) -> Path:
+        """
+        Stream repodata into a temporary file next to cache_path_json, to be
+        moved into place by _replace_cache().
+        """
+        cache_path_json = self._cache_path_json
+        temp_path = cache_path_json.with_name(
+            f"{cache_path_json.name}.{os.urandom(4).hex()}.tmp"
+        )
+        try:
+            cache_path_json.parent.mkdir(parents=True, exist_ok=True)
+            with temp_path.open("xb") as temp:  # exclusive mode, error if exists
+                for chunk in chunks:
+                    if hasher:
+                        hasher.update(chunk)
+                    temp.write(chunk)
+        except BaseException as e:
+            _unlink(temp_path)
+            if isinstance(e, OSError) and e.errno in (EACCES, EPERM, EROFS):
+                raise NotWritableError(cache_path_json, e.errno, caused_by=e)
+            raise
+        return temp_path
+
+    def _replace_cache(self, temp_path: Path, state: RepodataState) -> None:
+        """
+        Move temp_path onto cache_path_json and save state, with its mtime and
+        size, while holding the .state.json lock.
+        """
+        cache_path_json = self._cache_path_json
+        cache = RepodataCache(
+            cache_path_json.with_suffix(""),
+            self._repodata_fn,
+            cache_path_json=cache_path_json,
+            cache_path_state=self._cache_path_state,
+        )
+        cache.state = state
+        try:
+            cache.replace(temp_path)
+        except OSError as e:
+            if e.errno in (EACCES, EPERM, EROFS):
+                raise NotWritableError(cache_path_json, e.errno, caused_by=e)
+            raise
+
+    def _use_jlap(self, state: RepodataState) -> bool:
+        """Return True if we can update the cached repodata with .jlap patches."""
+        jlap_fetch = _jlap_fetch()
+        return bool(
+            jlap_fetch
+            and self._cache_path_json
+            and state.get(jlap_fetch.NOMINAL_HASH)
+            and state.should_check_format("jlap")
+            and self._cache_path_json.exists()
+        )
+
+    def _jlap_interface(self) -> RepoInterface:
+        from .jlap.interface import JlapRepoInterface
+
+        return JlapRepoInterface(
+            self._url,
+            self._repodata_fn,
+            cache_path_json=self._cache_path_json,
+            cache_path_state=self._cache_path_state,
+            # .jlap requests use the same transport as ours
+            session=_GetSession(self._get),
+            allow_full_download=False,
+        )
+
+    def _use_zst(self, state: RepodataState) -> bool:
+        """Return True if we should try to fetch repodata.json.zst."""
+        return bool(
+            zstandard and context.repodata_use_zst and state.should_check_format("zst")
+        )
+
+
+class _GetSession:
+    """Just enough of Session for jlap, sending GET through RepoInterface._get()."""
+
+    def __init__(self, get):
+        self._get = get
+
+    def get(self, url: str, headers=None, **kwargs) -> Response:
+        # _get() always streams, with conda's timeouts
+        return self._get(url, dict(headers or {}))
+
+
+def _release(response: Response) -> None:
+    """
+    Read the short body of a 304 or error response, then close it.
+
+    A streamed response that is closed before its body is read drops the
+    connection instead of returning it to the pool.
+    """
+    try:
+        response.content
+    except Exception as e:  # already failed; close() drops the connection
+        log.debug("Could not read response body", exc_info=e)
+    response.close()
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _iter_content(response: Response, use_zst: bool) -> Iterator[bytes]:
+    """Yield the response body, decompressing .zst as it arrives."""
+    chunks = response.iter_content(chunk_size=1 << 20)
+    if not use_zst:
+        yield from chunks
+        return
+    dctx = zstandard.ZstdDecompressor()
+    decompressor = dctx.decompressobj()
+    complete = False  # at the end of a frame
+    for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            complete = decompressor.eof
+            if not complete:
+                break
+            # zstd allows several concatenated frames
+            chunk = decompressor.unused_data
+            decompressor = dctx.decompressobj()
+    if not complete:
+        # don't cache a truncated download under the server's etag
+        raise ChunkedEncodingError(f"Incomplete .zst response from {response.url}")
+
+
+@functools.lru_cache(maxsize=None)
+def _jlap_fetch():
+    """Return conda.gateways.repodata.jlap.fetch, or None if it can't be imported."""
+    try:
+        from .jlap import fetch
+    except ImportError:  # pragma: no cover
+        # jsonpatch or zstandard not installed
+        return None
+    return fetch
+
+
+def repodata_json_loads(data: str | bytes) -> Any:
+    """
+    Parse repodata or .state.json, with the faster orjson if installed.
+
+    Only for these files: orjson returns integers wider than 64 bits as floats.
+    """
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. NaN, which json accepts; report errors like json does
+            pass
+    return json.loads(data)
+
 
 def _add_http_value_to_dict(resp, http_key, d, dict_key):
     value = resp.headers.get(http_key)
@@ -155,6 +451,100 @@ def _add_http_value_to_dict(resp, http_key, d, dict_key):
         d[dict_key] = value
 
 
+def _http_date(value: str | None) -> str:
+    """
+    Normalize a Last-Modified value to an RFC 1123 HTTP-date, or "".
+
+    Servers may only answer 304 to a well-formed If-Modified-Since.
+    """
+    if not value:
+        return ""
+    try:
+        modified = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        log.debug("Could not parse Last-Modified %r", value)
+        return ""
+    if modified.tzinfo is None:  # "-0000" in the header
+        modified = modified.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(modified.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+_CONFIG_DOCS_URL = join_url(CONDA_HOMEPAGE_URL, "docs/config.html")
+
+#: conda_http_errors() help messages, keyed by _classify_http_error()
+_HELP_TEMPLATES = {
+    "auth_token": f"""\
+The token '{{token}}' given for the URL is invalid.
+
+If this token was pulled from anaconda-client, you will need to use
+anaconda-client to reauthenticate.
+
+If you supplied this token to conda directly, you will need to adjust your
+conda configuration to proceed.
+
+Use `conda config --show` to view your configuration's current state.
+Further configuration help can be found at <{_CONFIG_DOCS_URL}>.
+""",
+    # Note, this will not trigger if the binstar configured url does not match
+    # the conda configured one.
+    "auth_alias": f"""\
+The remote server has indicated you are using invalid credentials for this channel.
+
+If the remote site is anaconda.org or follows the Anaconda Server API, you
+will need to
+    (a) remove the invalid token from your system with `anaconda logout`, optionally
+        followed by collecting a new token with `anaconda login`, or
+    (b) provide conda with a valid token directly.
+
+Further configuration help can be found at <{_CONFIG_DOCS_URL}>.
+""",
+    "auth": f"""\
+The credentials you have provided for this URL are invalid.
+
+You will need to modify your conda configuration to proceed.
+Use `conda config --show` to view your configuration's current state.
+Further configuration help can be found at <{_CONFIG_DOCS_URL}>.
+""",
+    "5xx": """\
+A remote server error occurred when trying to retrieve this URL.
+
+A 500-type error (e.g. 500, 501, 502, 503, etc.) indicates the server failed to
+fulfill a valid request.  The problem may be spurious, and will resolve itself if you
+try your request again.  If the problem persists, consider notifying the maintainer
+of the remote server.
+""",
+    "repo_anaconda": """\
+An HTTP error occurred when trying to retrieve this URL.
+HTTP errors are often intermittent, and a simple retry will get you on your way.
+
+If your current network has https://www.anaconda.com blocked, please file
+a support request with your network engineering team.
+
+{url}
+""",
+    "generic": """\
+An HTTP error occurred when trying to retrieve this URL.
+HTTP errors are often intermittent, and a simple retry will get you on your way.
+{url}
+""",
+}
+
+
+def _classify_http_error(status_code: int | None, url: str) -> str:
+    """Return the _HELP_TEMPLATES key for an HTTP error that isn't 403/404."""
+    if status_code == 401:
+        if Channel(url).token:
+            return "auth_token"
+        if context.channel_alias.location in url:
+            return "auth_alias"
+        return "auth"
+    if status_code is not None and 500 <= status_code < 600:
+        return "5xx"
+    if url.startswith("https://repo.anaconda.com/"):
+        return "repo_anaconda"
+    return "generic"
+
+
 @contextmanager
 def conda_http_errors(url, repodata_fn):
     """Use in a with: statement to translate requests exceptions to conda ones."""
@@ -230,85 +620,11 @@ Exception: {e}
                         response=e.response,
                     )
 
-        elif status_code == 401:
-            channel = Channel(url)
-            if channel.token:
-                help_message = """\
-The token '{}' given for the URL is invalid.
-
-If this token was pulled from anaconda-client, you will need to use
-anaconda-client to reauthenticate.
-
-If you supplied this token to conda directly, you will need to adjust your
-conda configuration to proceed.
-
-Use `conda config --show` to view your configuration's current state.
-Further configuration help can be found at <{}>.
-""".format(
-                    channel.token,
-                    join_url(CONDA_HOMEPAGE_URL, "docs/config.html"),
-                )
-
-            elif context.channel_alias.location in url:
-                # Note, this will not trigger if the binstar configured url does
-                # not match the conda configured one.
-                help_message = """\
-The remote server has indicated you are using invalid credentials for this channel.
-
-If the remote site is anaconda.org or follows the Anaconda Server API, you
-will need to
-    (a) remove the invalid token from your system with `anaconda logout`, optionally
-        followed by collecting a new token with `anaconda login`, or
-    (b) provide conda with a valid token directly.
-
-Further configuration help can be found at <%s>.
-""" % join_url(
-                    CONDA_HOMEPAGE_URL, "docs/config.html"
-                )
-
-            else:
-                help_message = """\
-The credentials you have provided for this URL are invalid.
-
-You will need to modify your conda configuration to proceed.
-Use `conda config --show` to view your configuration's current state.
-Further configuration help can be found at <%s>.
-""" % join_url(
-                    CONDA_HOMEPAGE_URL, "docs/config.html"
-                )
-
-        elif status_code is not None and 500 <= status_code < 600:
-            help_message = """\
-A remote server error occurred when trying to retrieve this URL.
-
-A 500-type error (e.g. 500, 501, 502, 503, etc.) indicates the server failed to
-fulfill a valid request.  The problem may be spurious, and will resolve itself if you
-try your request again.  If the problem persists, consider notifying the maintainer
-of the remote server.
-"""
-
-        else:
-            if url.startswith("https://repo.anaconda.com/"):
-                help_message = """\
-An HTTP error occurred when trying to retrieve this URL.
-HTTP errors are often intermittent, and a simple retry will get you on your way.
-
-If your current network has https://www.anaconda.com blocked, please file
-a support request with your network engineering team.
-
-%s
-""" % maybe_unquote(
-                    repr(url)
-                )
-
-            else:
-                help_message = """\
-An HTTP error occurred when trying to retrieve this URL.
-HTTP errors are often intermittent, and a simple retry will get you on your way.
-%s
-""" % maybe_unquote(
-                    repr(url)
-                )
+        key = _classify_http_error(status_code, url)
+        help_message = _HELP_TEMPLATES[key].format(
+            token=Channel(url).token if key == "auth_token" else "",
+            url=maybe_unquote(repr(url)),
+        )
 
         raise CondaHTTPError(
             help_message,
@@ -321,10 +637,11 @@ HTTP errors are often intermittent, and a simple retry will get you on your way.
         )
 
 
-class RepodataState(UserDict):
+class RepodataState(dict):
     """Load/save `.state.json` that accompanies cached `repodata.json`."""
 
-    _aliased = {"_mod", "_etag", "_cache_control", "_url"}
+    # legacy underscore-prefixed keys, stored without the underscore
+    _aliases = {key: key[1:] for key in ("_mod", "_etag", "_cache_control", "_url")}
     _strings = {"mod", "etag", "cache_control", "url"}
 
     def __init__(
@@ -334,8 +651,9 @@ class RepodataState(UserDict):
         repodata_fn="",
         dict=None,
     ):
-        # dict is a positional-only argument in UserDict.
-        super().__init__(dict)
+        super().__init__()
+        if dict:
+            self.update(dict)  # through __setitem__, to strip aliases
         self.cache_path_json = pathlib.Path(cache_path_json)
         self.cache_path_state = pathlib.Path(cache_path_state)
         # XXX may not be that useful/used compared to the full URL
@@ -351,7 +669,7 @@ class RepodataState(UserDict):
         try:
             state_path = self.cache_path_state
             log.debug("Load %s cache from %s", self.repodata_fn, state_path)
-            state = json.loads(state_path.read_text())
+            state = repodata_json_loads(state_path.read_bytes())
             # json and state files should match
             json_stat = self.cache_path_json.stat()
             if not (
@@ -369,14 +687,32 @@ class RepodataState(UserDict):
     @deprecated("23.3", "23.9", addendum="use RepodataCache")
     def save(self):
         """Must be called after writing cache_path_json, since mtime is included in .state.json."""
-        serialized = dict(self)
         json_stat = self.cache_path_json.stat()
-        serialized.update(
-            {"mtime_ns": json_stat.st_mtime_ns, "size": json_stat.st_size}
-        )
-        return pathlib.Path(self.cache_path_state).write_text(
-            json.dumps(serialized, indent=True)
+        self["mtime_ns"] = json_stat.st_mtime_ns
+        self["size"] = json_stat.st_size
+        data = json.dumps(self, indent=True)
+        try:
+            unchanged = self.cache_path_state.read_text() == data
+        except OSError:
+            unchanged = False
+        if unchanged:
+            # e.g. after a 304 Not Modified; only the file's mtime changes
+            os.utime(self.cache_path_state)
+            return len(data)
+
+        # readers never see a partially written file
+        temp_path = self.cache_path_state.with_name(
+            f"{self.cache_path_state.name}.{os.urandom(4).hex()}.tmp"
         )
+        try:
+            written = temp_path.write_text(data)
+            os.replace(temp_path, self.cache_path_state)
+        finally:
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
+        return written
 
     @property
     def mod(self) -> str:
@@ -462,19 +798,36 @@ class RepodataState(UserDict):
         )
 
     def __setitem__(self, key: str, item: Any) -> None:
-        if key in self._aliased:
-            key = key[1:]  # strip underscore
+        key = self._aliases.get(key, key)
         if key in self._strings and not isinstance(item, str):
-            warnings.warn('Replaced non-str RepodataState[{key}] with ""')
+            warnings.warn(f'Replaced non-str RepodataState[{key}] with ""')
             item = ""
-        return super().__setitem__(key, item)
+        dict.__setitem__(self, key, item)
 
     def __missing__(self, key: str):
-        if key in self._aliased:
-            key = key[1:]  # strip underscore
-        else:
-            raise KeyError(key)
-        return super().__getitem__(key)
+        try:
+            key = self._aliases[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return dict.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # dict.get() would bypass __missing__
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, *args, **kwargs) -> None:
+        # dict.update() would bypass __setitem__
+        for key, item in dict(*args, **kwargs).items():
+            self[key] = item
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        key = self._aliases.get(key, key)
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
 
 
 class RepodataCache:
@@ -485,14 +838,25 @@ class RepodataCache:
     Avoid race conditions while loading, saving repodata.json and cache state.
     """
 
-    def __init__(self, base, repodata_fn):
+    def __init__(
+        self, base, repodata_fn, *, cache_path_json=None, cache_path_state=None
+    ):
         """
         base: directory and filename prefix for cache, e.g. /cache/dir/abc123;
         writes /cache/dir/abc123.json
+
+        cache_path_json, cache_path_state: use these paths instead of deriving
+        them from base, e.g. the paths given to a RepoInterface.
         """
         cache_path_base = pathlib.Path(base)
         self.cache_dir = cache_path_base.parent
         self.name = cache_path_base.name
+        self._cache_path_json = (
+            pathlib.Path(cache_path_json) if cache_path_json else None
+        )
+        self._cache_path_state = (
+            pathlib.Path(cache_path_state) if cache_path_state else None
+        )
         # XXX can we skip repodata_fn or include the full url for debugging
         self.repodata_fn = repodata_fn
         self.state = RepodataState(
@@ -501,6 +865,8 @@ class RepodataCache:
 
     @property
     def cache_path_json(self):
+        if self._cache_path_json:
+            return self._cache_path_json
         return pathlib.Path(
             self.cache_dir,
             self.name + ("1" if context.use_only_tar_bz2 else "") + ".json",
@@ -509,6 +875,8 @@ class RepodataCache:
     @property
     def cache_path_state(self):
         """Out-of-band etag and other state needed by the RepoInterface."""
+        if self._cache_path_state:
+            return self._cache_path_state
         return pathlib.Path(
             self.cache_dir,
             self.name + ("1" if context.use_only_tar_bz2 else "") + ".state.json",
@@ -525,7 +893,7 @@ class RepodataCache:
         with self.cache_path_state.open("r+") as state_file, lock(state_file):
             # cannot use pathlib.read_text / write_text on any locked file, as
             # it will release the lock early
-            state = json.loads(state_file.read())
+            state = repodata_json_loads(state_file.read())
 
             # json and state files should match. must read json before checking
             # stat (if json_data is to be trusted)
@@ -601,10 +969,9 @@ class RepodataCache:
             state_file.truncate()
             stat = temp_path.stat()
             # XXX make sure self.state has the correct etag, etc. for temp_path.
-            # UserDict has inscrutable typing, which we ignore
-            self.state["mtime_ns"] = stat.st_mtime_ns  # type: ignore
-            self.state["size"] = stat.st_size  # type: ignore
-            self.state["refresh_ns"] = time.time_ns()  # type: ignore
+            self.state["mtime_ns"] = stat.st_mtime_ns
+            self.state["size"] = stat.st_size
+            self.state["refresh_ns"] = time.time_ns()
             try:
                 temp_path.rename(self.cache_path_json)
             except FileExistsError:  # Windows
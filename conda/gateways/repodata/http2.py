@@ -0,0 +1,231 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Download repodata over HTTP/2 with httpx.
+
+One client, and connection pool, is shared by every thread, so channels and
+subdirs fetched in parallel from the same host are multiplexed over a single
+TLS connection instead of opening one HTTP/1.1 connection each.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import ssl
+import time
+from urllib.request import getproxies
+
+import httpx
+from requests import Request
+
+from conda.base.context import context
+from conda.common.url import urlparse
+from conda.gateways.connection import (
+    CaseInsensitiveDict,
+    ChunkedEncodingError,
+    ConnectionError,
+    RequestsProxyError,
+    Response,
+    SSLError,
+)
+from conda.gateways.connection.session import CondaSession
+
+from . import CondaRepoInterface
+
+log = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 16
+
+# same as CondaSession's Retry
+RETRY_STATUSES = frozenset((413, 429, 500, 503))
+RETRY_AFTER_STATUSES = frozenset((413, 429, 503))
+BACKOFF_MAX = 120
+
+# requests' limit
+MAX_REDIRECTS = 30
+
+# connection-specific headers are not allowed in HTTP/2
+HOP_BY_HOP_HEADERS = frozenset(("connection", "keep-alive", "transfer-encoding"))
+
+# CondaSession advertises urllib3's decoders; httpx sets its own
+DROPPED_HEADERS = HOP_BY_HOP_HEADERS | {"accept-encoding"}
+
+
+def _ssl_context(
+    verify: bool | str, client_ssl_cert: str | None, client_ssl_cert_key: str | None
+) -> ssl.SSLContext | bool:
+    """Translate conda's ssl_verify and client certificate settings."""
+    if verify is False:
+        return False
+    if isinstance(verify, str):
+        ssl_context = ssl.create_default_context(
+            cafile=verify if os.path.isfile(verify) else None,
+            capath=verify if os.path.isdir(verify) else None,
+        )
+    else:
+        try:
+            import certifi
+        except ImportError:  # pragma: no cover
+            ssl_context = ssl.create_default_context()
+        else:
+            # same bundle as requests
+            ssl_context = ssl.create_default_context(cafile=certifi.where())
+    if client_ssl_cert:
+        ssl_context.load_cert_chain(client_ssl_cert, client_ssl_cert_key)
+    return ssl_context
+
+
+def _client() -> httpx.Client:
+    """
+    Shared by all threads; httpx.Client is thread-safe.
+
+    A new client is built when the ssl or retry settings change, e.g. after
+    the context is reset.
+    """
+    return _cached_client(
+        context.ssl_verify,
+        context.client_ssl_cert,
+        context.client_ssl_cert_key,
+        context.remote_max_retries,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_client(
+    verify: bool | str,
+    client_ssl_cert: str | None,
+    client_ssl_cert_key: str | None,
+    retries: int,
+) -> httpx.Client:
+    transport = httpx.HTTPTransport(
+        http2=True,
+        verify=_ssl_context(verify, client_ssl_cert, client_ssl_cert_key),
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+        retries=retries,
+    )
+    # _use_http2() leaves proxied requests to CondaSession
+    return httpx.Client(
+        transport=transport,
+        trust_env=False,
+        follow_redirects=True,
+        max_redirects=MAX_REDIRECTS,
+    )
+
+
+def _use_http2(url: str) -> bool:
+    return (
+        urlparse(url).scheme in ("http", "https")
+        and not context.offline
+        and not context.proxy_servers
+        and not getproxies()
+    )
+
+
+def _retry_delay(response: httpx.Response, retry: int) -> float:
+    """Seconds to wait before retry number `retry`, like urllib3's Retry."""
+    retry_after = response.headers.get("retry-after", "")
+    if response.status_code in RETRY_AFTER_STATUSES and retry_after.isdigit():
+        return float(retry_after)
+    if retry <= 1:
+        return 0
+    return min(context.remote_backoff_factor * 2 ** (retry - 1), BACKOFF_MAX)
+
+
+def _caused_by_ssl_error(e: BaseException | None) -> bool:
+    while e is not None:
+        if isinstance(e, ssl.SSLError):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
+def _requests_error(e: httpx.TransportError, request) -> Exception:
+    """Map httpx errors onto the requests errors that conda_http_errors expects."""
+    if isinstance(e, httpx.ProxyError):
+        return RequestsProxyError(e, request=request)
+    if isinstance(e, httpx.ConnectError) and _caused_by_ssl_error(e):
+        return SSLError(e, request=request)
+    if isinstance(e, (httpx.ReadError, httpx.RemoteProtocolError)):
+        return ChunkedEncodingError(e, request=request)
+    return ConnectionError(e, request=request)
+
+
+class _RawStream:
+    """Just enough of urllib3's response for Response.iter_content() and close()."""
+
+    def __init__(self, response: httpx.Response, request):
+        self._response = response
+        self._request = request
+
+    def stream(self, chunk_size: int, decode_content=True):
+        try:
+            # iter_bytes() undoes Content-Encoding like decode_content=True
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TransportError as e:
+            raise _requests_error(e, self._request) from e
+
+    def close(self):
+        self._response.close()
+
+
+def _to_response(response: httpx.Response, request) -> Response:
+    """Wrap a streamed httpx response in the requests API."""
+    converted = Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    # repeated headers are joined with ", " like requests does
+    converted.headers = CaseInsensitiveDict(response.headers.items())
+    converted.url = str(response.url)
+    converted.request = request
+    converted.raw = _RawStream(response, request)
+    return converted
+
+
+class CondaRepoInterfaceH2(CondaRepoInterface):
+    """CondaRepoInterface that sends its requests over HTTP/2 with httpx."""
+
+    def _get(self, url: str, headers: dict[str, str]) -> Response:
+        if not _use_http2(url):
+            return super()._get(url, headers)
+
+        # CondaSession adds the user agent, anaconda.org tokens and basic or
+        # .netrc credentials
+        prepared = CondaSession().prepare_request(Request("GET", url, headers=headers))
+        client = _client()
+        request = client.build_request(
+            prepared.method,
+            prepared.url,
+            headers={
+                key: value
+                for key, value in prepared.headers.items()
+                if key.lower() not in DROPPED_HEADERS
+            },
+            timeout=httpx.Timeout(
+                context.remote_read_timeout_secs,
+                connect=context.remote_connect_timeout_secs,
+            ),
+        )
+        # the transport only retries failed connections
+        retry = 0
+        while True:
+            try:
+                response = client.send(request, stream=True)
+            except httpx.TransportError as e:
+                raise _requests_error(e, prepared) from e
+            if (
+                response.status_code not in RETRY_STATUSES
+                or retry >= context.remote_max_retries
+            ):
+                break
+            retry += 1
+            delay = _retry_delay(response, retry)
+            try:
+                response.read()  # keep an HTTP/1.1 connection
+            except httpx.TransportError:
+                pass
+            response.close()
+            log.debug("Retrying %s after %s in %ss", url, response.status_code, delay)
+            time.sleep(delay)
+        log.debug("%s %s %s", response.http_version, response.status_code, url)
+        return _to_response(response, prepared)
@@ -61,6 +61,10 @@ class JlapPatchNotFound(LookupError):
     pass
 
 
+class JlapFullDownload(Exception):
+    """The complete repodata.json is needed, and the caller will download it."""
+
+
 def process_jlap_response(response: Response, pos=0, iv=b""):
     # if response is 304 Not Modified, could return a buffer with only the
     # cached footer...
@@ -215,11 +219,23 @@ class HashWriter(io.RawIOBase):
 
 
 def download_and_hash(
-    hasher, url, json_path, session: Session, state: RepodataState | None, is_zst=False
+    hasher,
+    url,
+    json_path,
+    session: Session,
+    state: RepodataState | None,
+    is_zst=False,
+    *,
+    write_path: pathlib.Path | None = None,
 ):
-    """Download url if it doesn't exist, passing bytes through hasher.update()."""
+    """
+    Download url if it doesn't exist, passing bytes through hasher.update().
+
+    Write to write_path instead of json_path, if given.
+    """
     state = state or RepodataState()
     headers = build_headers(json_path, state)
+    write_path = write_path or json_path
     timeout = context.remote_connect_timeout_secs, context.remote_read_timeout_secs
     response = session.get(url, stream=True, timeout=timeout, headers=headers)
     log.debug("%s %s", url, response.headers)
@@ -230,10 +246,10 @@ def download_and_hash(
         if is_zst:
             decompressor = zstandard.ZstdDecompressor()
             writer = decompressor.stream_writer(
-                HashWriter(json_path.open("wb"), hasher), closefd=True  # type: ignore
+                HashWriter(write_path.open("wb"), hasher), closefd=True  # type: ignore
             )
         else:
-            writer = HashWriter(json_path.open("wb"), hasher)
+            writer = HashWriter(write_path.open("wb"), hasher)
         with writer as repodata:
             for block in response.iter_content(chunk_size=1 << 14):
                 repodata.write(block)
@@ -249,7 +265,17 @@ def request_url_jlap_state(
     full_download=False,
     *,
     session: Session,
+    write_path: pathlib.Path | None = None,
+    allow_full_download=True,
 ):
+    """
+    Update the repodata.json at get_place(url) with .jlap patches, downloading
+    all of it if necessary.
+
+    Write new or patched repodata to write_path instead, if given. Raise
+    JlapFullDownload instead of downloading the complete file if
+    allow_full_download is False.
+    """
     jlap_state = state.get(JLAP_KEY, {})
     headers = jlap_state.get(HEADERS, {})
 
@@ -262,6 +288,9 @@ def request_url_jlap_state(
         or not (NOMINAL_HASH in state and json_path.exists())
         or not state.should_check_format("jlap")
     ):
+        if not allow_full_download:
+            raise JlapFullDownload()
+
         hasher = hash()
         with timeme(f"Download complete {url} "):
             # Don't deal with 304 Not Modified if hash unavailable e.g. if
@@ -271,7 +300,7 @@ def request_url_jlap_state(
                 state.pop("mod", None)
 
             try:
-                if state.should_check_format("zst"):
+                if context.repodata_use_zst and state.should_check_format("zst"):
                     response = download_and_hash(
                         hasher,
                         withext(url, ".json.zst"),
@@ -279,6 +308,7 @@ def request_url_jlap_state(
                         session=session,
                         state=state,
                         is_zst=True,
+                        write_path=write_path,
                     )
                 else:
                     raise JlapSkipZst()
@@ -295,6 +325,7 @@ def request_url_jlap_state(
                     json_path,
                     session=session,
                     state=state,
+                    write_path=write_path,
                 )
 
             # will we use state['headers'] for caching against
@@ -341,7 +372,13 @@ def request_url_jlap_state(
             if e.response.status_code == 404:
                 state.set_has_format("jlap", False)
                 return request_url_jlap_state(
-                    url, state, get_place=get_place, full_download=True, session=session
+                    url,
+                    state,
+                    get_place=get_place,
+                    full_download=True,
+                    session=session,
+                    write_path=write_path,
+                    allow_full_download=allow_full_download,
                 )
             log.exception("Requests error")
 
@@ -384,7 +421,9 @@ def request_url_jlap_state(
 
                 apply_patches(repodata_json, apply)
 
-                with timeme("Write changed "), json_path.open("wb") as repodata:
+                with timeme("Write changed "), (write_path or json_path).open(
+                    "wb"
+                ) as repodata:
                     hasher = hash()
                     HashWriter(repodata, hasher).write(
                         json.dumps(repodata_json).encode("utf-8")
@@ -412,5 +451,11 @@ def request_url_jlap_state(
             assert not full_download, "Recursion error"  # pragma: no cover
 
             return request_url_jlap_state(
-                url, state, get_place=get_place, full_download=True, session=session
+                url,
+                state,
+                get_place=get_place,
+                full_download=True,
+                session=session,
+                write_path=write_path,
+                allow_full_download=allow_full_download,
             )
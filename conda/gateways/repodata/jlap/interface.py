@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
 
+from conda.gateways.connection import Session
 from conda.gateways.connection.session import CondaSession
 
 from .. import (
+    RepodataCache,
     RepodataOnDisk,
     RepodataState,
     RepoInterface,
@@ -26,6 +29,8 @@ class JlapRepoInterface(RepoInterface):
         repodata_fn: str | None,
         cache_path_json: str | Path,
         cache_path_state: str | Path,
+        session: Session | None = None,
+        allow_full_download: bool = True,
         **kwargs,
     ) -> None:
         log.debug("Using CondaRepoJLAP")
@@ -36,12 +41,16 @@ class JlapRepoInterface(RepoInterface):
 
         self._url = url
         self._repodata_fn = repodata_fn
+        # anything with Session.get(); defaults to a CondaSession
+        self._session = session
+        # if False, raise fetch.JlapFullDownload when only patching won't do
+        self._allow_full_download = allow_full_download
 
         self._log = logging.getLogger(__name__)
         self._stderrlog = logging.getLogger("conda.stderrlog")
 
     def repodata(self, state: dict | RepodataState) -> str | None:
-        session = CondaSession()
+        session = self._session or CondaSession()
 
         repodata_url = f"{self._url}/{self._repodata_fn}"
         # jlap_url = f"{self._url}/{self._repodata_fn}"[: -len(".json")] + ".jlap"
@@ -54,25 +63,57 @@ class JlapRepoInterface(RepoInterface):
                 return self._cache_path_json
             raise NotImplementedError("Unexpected URL", url)
 
+        # new or patched repodata is moved into place with the final state
+        temp_path = self._cache_path_json.with_name(
+            f"{self._cache_path_json.name}.{os.urandom(4).hex()}.tmp"
+        )
         try:
-            with conda_http_errors(self._url, self._repodata_fn):
-                fetch.request_url_jlap_state(
-                    repodata_url, state_, get_place=get_place, session=session
+            try:
+                with conda_http_errors(self._url, self._repodata_fn):
+                    fetch.request_url_jlap_state(
+                        repodata_url,
+                        state_,
+                        get_place=get_place,
+                        session=session,
+                        write_path=temp_path,
+                        allow_full_download=self._allow_full_download,
+                    )
+            except fetch.Jlap304NotModified:
+                raise Response304ContentUnchanged()
+            except fetch.JlapFullDownload:
+                # keep e.g. "jlap unavailable" for the caller's download
+                state.update(state_)
+                raise
+
+            # XXX update caller's state dict-or-RepodataState
+            state.update(state_)
+
+            state["_url"] = self._url
+            headers = state.get("jlap", {}).get(
+                "headers"
+            )  # XXX overwrite headers in jlapper.request_url_jlap_state
+            if headers:
+                state["_etag"] = headers.get("etag")
+                state["_mod"] = headers.get("last-modified")
+                state["_cache_control"] = headers.get("cache-control")
+
+            if temp_path.exists():
+                cache = RepodataCache(
+                    self._cache_path_json.with_suffix(""),
+                    self._repodata_fn,
+                    cache_path_json=self._cache_path_json,
+                    cache_path_state=self._cache_path_state,
                 )
-        except fetch.Jlap304NotModified:
-            raise Response304ContentUnchanged()
-
-        # XXX update caller's state dict-or-RepodataState
-        state.update(state_)
-
-        state["_url"] = self._url
-        headers = state.get("jlap", {}).get(
-            "headers"
-        )  # XXX overwrite headers in jlapper.request_url_jlap_state
-        if headers:
-            state["_etag"] = headers.get("etag")
-            state["_mod"] = headers.get("last-modified")
-            state["_cache_control"] = headers.get("cache-control")
+                cache.state = state
+                cache.replace(temp_path)
+                # Indicate that subdir_data mustn't rewrite cache_path_json or
+                # its state
+                raise RepodataOnDisk(state_saved=True)
+        finally:
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
 
         # Indicate that subdir_data mustn't rewrite cache_path_json
         raise RepodataOnDisk()
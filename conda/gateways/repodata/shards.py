@@ -0,0 +1,313 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Sharded repodata (CEP-16).
+
+A sharded channel publishes a small ``repodata_shards.msgpack.zst`` index that
+maps each package name to the sha256 of a per-name shard
+``<shards_base_url>/<sha256>.msgpack.zst``. Shards are content-addressed, so an
+updated channel only costs the index plus the shards that actually changed.
+
+SubdirData still needs every record, so this only pays off when few shards are
+missing from the cache. With more than MAX_SHARD_FETCHES to download,
+ShardedRepoInterface caches that many and uses repodata.json this time; a large
+channel is read from shards once enough runs have filled the cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Any
+from urllib.parse import urljoin
+
+import msgpack
+import zstandard
+
+from conda import CondaError
+from conda.auxlib.ish import dals
+from conda.base.constants import REPODATA_FN
+from conda.base.context import context
+from conda.common.io import ThreadLimitedThreadPoolExecutor
+from conda.common.url import join_url, maybe_unquote
+from conda.gateways.connection import HTTPError, Response
+from conda.gateways.connection.session import CondaSession
+
+from . import (
+    CondaRepoInterface,
+    RepodataState,
+    RepoInterface,
+    Response304ContentUnchanged,
+    _add_http_value_to_dict,
+    conda_http_errors,
+)
+
+log = logging.getLogger(__name__)
+
+SHARDS_INDEX_FN = "repodata_shards.msgpack.zst"
+
+# more uncached shards than this are slower than one repodata.json download;
+# with more missing, this many are cached per load until the rest fit
+MAX_SHARD_FETCHES = 256
+
+
+class ShardError(CondaError):
+    """A shard listed in the index is unavailable or doesn't match its sha256."""
+
+    def __init__(self, url: str, reason: str):
+        message = dals(
+            """
+            Could not load sharded repodata from '%(url)s': %(reason)s
+
+            The channel's shard index may be out of date. Try again later, or
+            remove "sharded" from the `experimental` setting in your .condarc
+            to use repodata.json instead.
+            """
+        )
+        super().__init__(message, url=maybe_unquote(url), reason=reason)
+
+
+def _decode(obj: Any) -> Any:
+    """Convert msgpack bytes (sha256, md5) to the hex strings used by repodata.json."""
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if isinstance(obj, dict):
+        return {key: _decode(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(value) for value in obj]
+    return obj
+
+
+def _unpack(data: bytes) -> dict:
+    return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(data))
+
+
+class ShardedRepodata(Mapping):
+    """
+    repodata.json-like mapping backed by a shard index.
+
+    Individual shards are fetched on demand with ``shard()`` or ``shards()``;
+    the ``packages`` and ``packages.conda`` keys fetch every shard.
+    """
+
+    def __init__(self, url: str, index: dict, cache_dir: Path | None = None):
+        self.url = url
+        self.index = index
+        self.cache_dir = cache_dir
+        self._shards: dict[str, dict] = {}
+        self._packages: dict[str, dict] | None = None
+
+    @property
+    def names(self) -> list[str]:
+        """Package names available in this channel/subdir."""
+        return list(self.index["shards"])
+
+    def shard_url(self, name: str) -> str:
+        sha256 = self.index["shards"][name].hex()
+        # may be absolute, or relative to the index
+        base_url = self.index.get("info", {}).get("shards_base_url") or "./shards/"
+        if not base_url.endswith("/"):
+            base_url += "/"
+        return urljoin(urljoin(self.url + "/", base_url), f"{sha256}.msgpack.zst")
+
+    def missing_names(self) -> list[str]:
+        """Package names whose shard is neither loaded nor cached."""
+        return [
+            name
+            for name in self.names
+            if name not in self._shards
+            and not (self.cache_dir and self._cache_path(name).exists())
+        ]
+
+    def shard(self, name: str) -> dict:
+        """Return the shard for one package name, fetching it if necessary."""
+        if name not in self._shards:
+            self._shards[name] = self._fetch_shard(name)
+        return self._shards[name]
+
+    def shards(self, names: Iterable[str]) -> dict[str, dict]:
+        """Return shards for several package names, fetching missing ones in parallel."""
+        names = list(names)
+        missing = [name for name in names if name not in self._shards]
+        if missing:
+            with ThreadLimitedThreadPoolExecutor(
+                max_workers=context.repodata_threads or 10
+            ) as executor:
+                for name, shard in zip(
+                    missing, executor.map(self._fetch_shard, missing)
+                ):
+                    self._shards[name] = shard
+        return {name: self._shards[name] for name in names}
+
+    def _cache_path(self, name: str) -> Path:
+        sha256 = self.index["shards"][name]
+        return self.cache_dir / f"{sha256.hex()}.msgpack.zst"
+
+    def _fetch_shard(self, name: str) -> dict:
+        sha256 = self.index["shards"][name]
+        cache_path = self._cache_path(name) if self.cache_dir else None
+        if cache_path:
+            try:
+                return _decode(_unpack(cache_path.read_bytes()))
+            except (OSError, ValueError, zstandard.ZstdError):
+                pass
+
+        session = CondaSession()
+        url = self.shard_url(name)
+        with conda_http_errors(self.url, url.rsplit("/", 1)[-1]):
+            timeout = (
+                context.remote_connect_timeout_secs,
+                context.remote_read_timeout_secs,
+            )
+            response: Response = session.get(
+                url, proxies=session.proxies, timeout=timeout
+            )
+            try:
+                response.raise_for_status()
+            except HTTPError as e:
+                # conda_http_errors() would report a 404 as an empty channel
+                raise ShardError(url, f"HTTP {response.status_code}") from e
+        data = response.content
+
+        if hashlib.sha256(data).digest() != sha256:
+            raise ShardError(url, "the shard does not match its sha256 in the index")
+
+        if cache_path:
+            temp_path = cache_path.with_suffix(f".{os.urandom(4).hex()}.tmp")
+            try:
+                temp_path.write_bytes(data)
+                os.replace(temp_path, cache_path)
+            except OSError:
+                log.debug("Could not cache shard %s", url, exc_info=True)
+
+        return _decode(_unpack(data))
+
+    def _all_packages(self) -> dict[str, dict]:
+        if self._packages is None:
+            packages: dict[str, dict] = {"packages": {}, "packages.conda": {}}
+            for shard in self.shards(self.names).values():
+                for key, records in packages.items():
+                    records.update(shard.get(key, {}))
+            self._packages = packages
+        return self._packages
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("packages", "packages.conda"):
+            return self._all_packages()[key]
+        if key in ("info", "repodata_version"):
+            return _decode(self.index[key])
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (key for key in ("info", "repodata_version") if key in self.index)
+        yield from ("packages", "packages.conda")
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class ShardedRepoInterface(RepoInterface):
+    """Retrieve sharded repodata, falling back to repodata.json."""
+
+    def __init__(
+        self,
+        url: str,
+        repodata_fn: str | None,
+        cache_path_json: str | Path | None = None,
+        cache_path_state: str | Path | None = None,
+        **kwargs,
+    ) -> None:
+        log.debug("Using ShardedRepoInterface")
+        self._url = url
+        self._repodata_fn = repodata_fn
+        self._cache_path_json = Path(cache_path_json) if cache_path_json else None
+        self._cache_path_state = Path(cache_path_state) if cache_path_state else None
+        self._fallback = CondaRepoInterface(
+            url,
+            repodata_fn,
+            cache_path_json=cache_path_json,
+            cache_path_state=cache_path_state,
+            **kwargs,
+        )
+
+    @property
+    def shard_cache_dir(self) -> Path | None:
+        """Content-addressed shards are shared by all channels in the cache."""
+        if not self._cache_path_json:
+            return None
+        cache_dir = self._cache_path_json.parent / "shards"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir
+
+    def repodata(self, state: RepodataState) -> ShardedRepodata | str | None:
+        # shards replace repodata.json, not e.g. current_repodata.json
+        if self._repodata_fn not in (None, REPODATA_FN) or not (
+            state.should_check_format("shards")
+        ):
+            return self._fallback.repodata(state)
+
+        session = CondaSession()
+
+        headers = {}
+        if state.etag and state.get("has_shards", {}).get("value"):
+            headers["If-None-Match"] = str(state.etag)
+
+        url = join_url(self._url, SHARDS_INDEX_FN)
+        with conda_http_errors(self._url, SHARDS_INDEX_FN):
+            timeout = (
+                context.remote_connect_timeout_secs,
+                context.remote_read_timeout_secs,
+            )
+            response: Response = session.get(
+                url, headers=headers, proxies=session.proxies, timeout=timeout
+            )
+            if response.status_code not in (403, 404):
+                response.raise_for_status()
+
+        if response.status_code in (403, 404):
+            state.set_has_format("shards", False)
+            return self._fallback.repodata(state)
+
+        state.set_has_format("shards", True)
+
+        if response.status_code == 304:
+            raise Response304ContentUnchanged()
+
+        index = _unpack(response.content)
+
+        sharded = ShardedRepodata(self._url, index, cache_dir=self.shard_cache_dir)
+        missing = sharded.missing_names()
+        if len(missing) > MAX_SHARD_FETCHES:
+            log.debug(
+                "%d shards not cached for %s; caching %d, using %s instead",
+                len(missing),
+                self._url,
+                MAX_SHARD_FETCHES,
+                REPODATA_FN,
+            )
+            try:
+                sharded.shards(missing[:MAX_SHARD_FETCHES])
+            except CondaError as e:
+                # repodata.json is still available
+                log.debug("Could not cache shards for %s", self._url, exc_info=e)
+            return self._fallback.repodata(state)
+
+        # SubdirData reads every record; fetch them here, where download
+        # errors are expected
+        sharded.shards(sharded.names)
+
+        saved_fields = {"_url": self._url}
+        _add_http_value_to_dict(response, "Etag", saved_fields, "_etag")
+        _add_http_value_to_dict(response, "Last-Modified", saved_fields, "_mod")
+        _add_http_value_to_dict(
+            response, "Cache-Control", saved_fields, "_cache_control"
+        )
+        saved_fields.update(
+            (key, value) for key, value in state.items() if key.startswith("has_")
+        )
+        state.clear()
+        state.update(saved_fields)
+
+        return sharded
@@ -1,5 +1,6 @@
 # Copyright (C) 2012 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
+import threading
 from logging import getLogger
 from unittest import TestCase
 
@@ -12,9 +13,11 @@ from conda.common.io import env_vars
 from conda.core.index import (
     _supplement_index_with_system,
     check_allowlist,
+    fetch_index,
     get_index,
     get_reduced_index,
 )
+from conda.core.subdir_data import SubdirData
 from conda.exceptions import ChannelNotAllowed
 from conda.models.channel import Channel
 from conda.models.enums import PackageType
@@ -47,6 +50,37 @@ def test_check_allowlist():
     check_allowlist(("conda-canary",))
 
 
+def test_fetch_index_loads_in_threads(mocker):
+    """Repodata for each channel url is fetched by the executor, not serially."""
+    loaded_in = []
+    # linux-64 and noarch must load at the same time, or this times out
+    barrier = threading.Barrier(2, timeout=10)
+
+    def load(self):
+        loaded_in.append(threading.current_thread())
+        barrier.wait()
+        self._package_records = []
+        self._loaded = True
+        return self
+
+    mocker.patch.object(SubdirData, "load", load)
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+    with env_vars(
+        {"CONDA_REPODATA_THREADS": "2"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        fetch_index(
+            (
+                "https://conda.anaconda.org/conda-test/linux-64",
+                "https://conda.anaconda.org/conda-test/noarch",
+            )
+        )
+    SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+    assert len(loaded_in) == 2
+    assert threading.main_thread() not in loaded_in
+
+
 def test_supplement_index_with_system():
     index = {}
     _supplement_index_with_system(index)
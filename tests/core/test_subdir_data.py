@@ -1,7 +1,10 @@
 # Copyright (C) 2012 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
+import json
+import threading
 from logging import getLogger
 from os.path import join
+from pathlib import Path
 from time import sleep
 from unittest import TestCase
 from unittest.mock import patch
@@ -259,6 +262,29 @@ def test_no_ssl(mocker):
         fetch_repodata_remote_request(url, etag, mod_stamp)
 
 
+def test_query_all_overlaps_subdirs(mocker):
+    """The platform subdir and noarch are fetched at the same time."""
+    barrier = threading.Barrier(2, timeout=10)
+
+    def query(self, package_ref_or_match_spec):
+        barrier.wait()
+        return ()
+
+    mocker.patch.object(SubdirData, "query", query)
+    with env_vars(
+        {"CONDA_REPODATA_THREADS": "2"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert (
+            SubdirData.query_all(
+                "zlib",
+                channels=("conda-test",),
+                subdirs=("linux-64", "noarch"),
+            )
+            == ()
+        )
+
+
 def test_subdir_data_prefers_conda_to_tar_bz2(platform=OVERRIDE_PLATFORM):
     # force this to False, because otherwise tests fail when run with old conda-build
     with env_vars(
@@ -356,6 +382,54 @@ def test_metadata_cache_works(platform=OVERRIDE_PLATFORM):
         assert fetcher.call_count == 1
 
 
+def test_use_index_cache_discards_stale_pickle(tmp_path, mocker):
+    """A pickle is not trusted once another writer replaces the cached json."""
+
+    def repodata(names):
+        return {
+            "info": {"subdir": "linux-64"},
+            "packages": {
+                f"{name}-1.0-0.tar.bz2": {
+                    "name": name,
+                    "version": "1.0",
+                    "build": "0",
+                    "build_number": 0,
+                    "depends": [],
+                }
+                for name in names
+            },
+        }
+
+    def fetch(self, state):
+        # enough for the pickle to be valid
+        state["_url"] = self._url
+        state.etag = '"old"'
+        state.mod = "Sun, 06 Nov 1994 08:49:37 GMT"
+        return json.dumps(repodata(["old"]))
+
+    mocker.patch.object(CondaRepoInterface, "repodata", fetch)
+    channel = Channel("https://example.com/stale-pickle/linux-64")
+    with env_vars(
+        {"CONDA_PKGS_DIRS": str(tmp_path)},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        sd = SubdirData(channel)
+        assert [rec.name for rec in sd.iter_records()] == ["old"]
+
+        Path(sd.cache_path_json).write_text(json.dumps(repodata(["new", "newer"])))
+
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+        with env_var(
+            "CONDA_USE_INDEX_CACHE",
+            "true",
+            stack_callback=conda_tests_ctxt_mgmt_def_pol,
+        ):
+            sd = SubdirData(channel)
+            assert sorted(rec.name for rec in sd.iter_records()) == ["new", "newer"]
+        SubdirData.clear_cached_local_channel_data(exclude_file=False)
+
+
 def test_metadata_cache_clearing(platform=OVERRIDE_PLATFORM):
     channel = Channel(join(CHANNEL_DIR, platform))
     SubdirData.clear_cached_local_channel_data()
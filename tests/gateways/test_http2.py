@@ -0,0 +1,113 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Test that CondaRepoInterfaceH2 behaves like CondaRepoInterface.
+"""
+import json
+from pathlib import Path
+from socket import socket
+
+import pytest
+
+from conda.base.context import conda_tests_ctxt_mgmt_def_pol, context
+from conda.common.io import env_vars
+from conda.gateways.repodata import RepodataState, Response304ContentUnchanged
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+from conda.gateways.repodata import http2  # noqa: E402
+from conda.gateways.repodata.http2 import CondaRepoInterfaceH2  # noqa: E402
+
+
+def test_repodata_http2(package_server: socket, package_repository_base: Path):
+    host, port = package_server.getsockname()
+    repo = CondaRepoInterfaceH2(
+        f"http://{host}:{port}/test/osx-64", repodata_fn="repodata.json"
+    )
+
+    state = RepodataState()
+    repodata = repo.repodata(state)
+    assert json.loads(repodata) == json.loads(
+        (package_repository_base / "osx-64" / "repodata.json").read_text()
+    )
+    assert state.etag
+
+    with pytest.raises(Response304ContentUnchanged):
+        repo.repodata(state)
+
+
+@pytest.fixture
+def mock_transport(mocker):
+    """Serve _client() requests from a handler instead of the network."""
+    handler = mocker.Mock()
+    mocker.patch.object(
+        httpx, "HTTPTransport", return_value=httpx.MockTransport(handler)
+    )
+    mocker.patch.object(http2.time, "sleep")
+    http2._cached_client.cache_clear()
+    # handlers serve uncompressed repodata.json only
+    with env_vars(
+        {"CONDA_REPODATA_USE_ZST": "false"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        yield handler
+    http2._cached_client.cache_clear()
+
+
+def test_repodata_http2_redirect(mock_transport):
+    repodata = '{"packages": {}}'
+
+    def handler(request):
+        if request.url.path == "/test/osx-64/repodata.json":
+            return httpx.Response(302, headers={"Location": "/moved/repodata.json"})
+        return httpx.Response(200, text=repodata)
+
+    mock_transport.side_effect = handler
+    repo = CondaRepoInterfaceH2(
+        "https://repo.example/test/osx-64", repodata_fn="repodata.json"
+    )
+    assert repo.repodata(RepodataState()) == repodata
+    assert mock_transport.call_count == 2
+
+
+def test_repodata_http2_retry(mock_transport):
+    repodata = '{"packages": {}}'
+    mock_transport.side_effect = [
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "1"}),
+        httpx.Response(200, text=repodata),
+    ]
+    repo = CondaRepoInterfaceH2(
+        "https://repo.example/test/osx-64", repodata_fn="repodata.json"
+    )
+    assert repo.repodata(RepodataState()) == repodata
+    assert mock_transport.call_count == 3
+
+
+def test_repodata_http2_accept_encoding(mock_transport):
+    """httpx advertises the encodings it can decode, not urllib3's."""
+    repodata = '{"packages": {}}'
+
+    def handler(request):
+        assert request.headers["accept-encoding"] == expected
+        return httpx.Response(200, text=repodata)
+
+    expected = httpx.Client().headers["accept-encoding"]
+    mock_transport.side_effect = handler
+    repo = CondaRepoInterfaceH2(
+        "https://repo.example/test/osx-64", repodata_fn="repodata.json"
+    )
+    assert repo.repodata(RepodataState()) == repodata
+
+
+def test_client_settings():
+    """Changed ssl_verify, client certificates or retries get a new client."""
+    client = http2._client()
+    assert http2._client() is client
+    with env_vars(
+        {"CONDA_REMOTE_MAX_RETRIES": str(context.remote_max_retries + 1)},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        assert http2._client() is not client
+    assert http2._client() is client
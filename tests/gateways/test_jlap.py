@@ -5,6 +5,7 @@ Test that SubdirData is able to use (or skip) incremental jlap downloads.
 """
 import datetime
 import json
+import shutil
 import time
 from pathlib import Path
 from socket import socket
@@ -413,10 +414,14 @@ def test_jlap_errors(
 
         # force 304 not modified on the .jlap file (test server doesn't return 304
         # not modified on range requests)
+        state = cache.load_state()
+        # the fallback saved its "jlap unavailable" to disk
+        assert state.has_format("jlap")[0] is False
+        state.pop("has_jlap", None)
         with mocker.patch.object(
             CondaSession, "get", return_value=Mock(status_code=304, headers={})
         ), pytest.raises(Response304ContentUnchanged):
-            sd._repo.repodata(cache.load_state())  # type: ignore
+            sd._repo.repodata(state)  # type: ignore
 
 
 @pytest.mark.parametrize("use_jlap", [True, False])
@@ -510,6 +515,94 @@ def test_jlap_cache_clock(
         assert cache.load_state()["refresh_ns"] == later2
 
 
+def test_conda_repo_interface_jlap(
+    package_server: socket, package_repository_base: Path, tmp_path: Path
+):
+    """Test that CondaRepoInterface patches its own cached repodata.json."""
+    host, port = package_server.getsockname()
+    repodata_path = package_repository_base / "jlap-64" / "repodata.json"
+    repodata_path.parent.mkdir()
+    shutil.copy(package_repository_base / "osx-64" / "repodata.json", repodata_path)
+
+    cache_path_json = tmp_path / "repodata.json"
+    repo = CondaRepoInterface(
+        f"http://{host}:{port}/test/jlap-64",
+        repodata_fn="repodata.json",
+        cache_path_json=cache_path_json,
+        cache_path_state=tmp_path / "repodata.state.json",
+    )
+
+    # full download records the hash needed to find patches later
+    state = RepodataState()
+    with pytest.raises(RepodataOnDisk):
+        repo.repodata(state)
+    assert cache_path_json.read_bytes() == repodata_path.read_bytes()
+    assert fetch.NOMINAL_HASH in state
+
+    test_jlap = make_test_jlap(repodata_path.read_bytes(), 2)
+    test_jlap.terminate()
+    test_jlap.write(repodata_path.with_suffix(".jlap"))
+
+    inode = cache_path_json.stat().st_ino
+    with pytest.raises(RepodataOnDisk) as e:
+        repo.repodata(state)
+    assert e.value.state_saved
+
+    patched = json.loads(cache_path_json.read_text())
+    assert len(patched["info"]) == 3
+    assert state.has_format("jlap")[0] is True
+
+    # patched into a temporary file, then moved into place with its state
+    stat = cache_path_json.stat()
+    assert stat.st_ino != inode
+    assert not list(tmp_path.glob("*.tmp"))
+    saved = json.loads((tmp_path / "repodata.state.json").read_text())
+    assert saved["mtime_ns"] == stat.st_mtime_ns
+    assert saved["size"] == stat.st_size
+    assert saved[fetch.NOMINAL_HASH] == state[fetch.NOMINAL_HASH]
+
+
+def test_conda_repo_interface_jlap_transport(
+    package_server: socket, package_repository_base: Path, tmp_path: Path, mocker
+):
+    """The .jlap hand-off keeps CondaRepoInterface's transport and zst setting."""
+    host, port = package_server.getsockname()
+    repodata_path = package_repository_base / "jlap-nozst" / "repodata.json"
+    repodata_path.parent.mkdir()
+    shutil.copy(package_repository_base / "osx-64" / "repodata.json", repodata_path)
+
+    cache_path_json = tmp_path / "repodata.json"
+    repo = CondaRepoInterface(
+        f"http://{host}:{port}/test/jlap-nozst",
+        repodata_fn="repodata.json",
+        cache_path_json=cache_path_json,
+        cache_path_state=tmp_path / "repodata.state.json",
+    )
+    get = mocker.spy(CondaRepoInterface, "_get")
+
+    with env_vars(
+        {"CONDA_REPODATA_USE_ZST": "false"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        state = RepodataState()
+        with pytest.raises(RepodataOnDisk):
+            repo.repodata(state)
+        assert fetch.NOMINAL_HASH in state
+
+        # no .jlap; falls back to our conditional request, not a full download
+        with pytest.raises(Response304ContentUnchanged):
+            repo.repodata(state)
+        assert state.has_format("jlap")[0] is False
+
+    urls = [call.args[1] for call in get.call_args_list]
+    assert urls[-2:] == [
+        f"http://{host}:{port}/test/jlap-nozst/repodata.jlap",
+        f"http://{host}:{port}/test/jlap-nozst/repodata.json",
+    ]
+    assert not any(url.endswith(".zst") for url in urls)
+    assert cache_path_json.read_bytes() == repodata_path.read_bytes()
+
+
 def test_jlap_zst_not_404(mocker, package_server, tmp_path):
     """
     Test that exception is raised if `repodata.json.zst` produces something
@@ -6,12 +6,17 @@ Strongly related to subdir_data / test_subdir_data.
 
 from __future__ import annotations
 
+import concurrent.futures
 import datetime
+import io
 import json
 import math
+import shutil
 import sys
+import threading
 import time
 from pathlib import Path
+from socket import socket
 
 import pytest
 
@@ -28,13 +33,21 @@ from conda.gateways.connection import (
     HTTPError,
     InvalidSchema,
     RequestsProxyError,
+    Response,
     SSLError,
 )
 from conda.gateways.repodata import (
+    CondaRepoInterface,
     RepodataCache,
     RepodataIsEmpty,
+    RepodataOnDisk,
     RepodataState,
+    Response304ContentUnchanged,
+    _add_http_value_to_dict,
+    _classify_http_error,
+    _http_date,
     conda_http_errors,
+    repodata_json_loads,
 )
 
 
@@ -70,6 +83,12 @@ def test_save(tmp_path):
     assert state3 == state2
 
 
+@pytest.mark.parametrize("data", ['{"packages": {}}', b'{"size": 1}', '{"x": NaN}'])
+def test_repodata_json_loads(data):
+    """Same results as json.loads, including what only json accepts."""
+    assert repr(repodata_json_loads(data)) == repr(json.loads(data))
+
+
 def test_stale(tmp_path):
     """RepodataCache should understand cache-control and modified time versus now."""
     TEST_DATA = "{}"
@@ -177,6 +196,21 @@ from conda.gateways.connection import (
 from conda.gateways.repodata import RepodataIsEmpty, conda_http_errors
 
 
+def test_repodata_state_aliases():
+    """Underscore-prefixed legacy keys are stored without the underscore."""
+    state = RepodataState(dict={"_etag": "abc"})
+    state.update({"_mod": "yesterday"}, _url="https://example.org")
+    state.setdefault("_cache_control", "max-age=30")
+    assert state == {
+        "etag": "abc",
+        "mod": "yesterday",
+        "url": "https://example.org",
+        "cache_control": "max-age=30",
+    }
+    assert state["_etag"] == state.get("_etag") == state.etag == "abc"
+    assert state.get("_missing", "default") == "default"
+
+
 def test_repodata_state_has_format():
     # wrong has_zst format
     state = RepodataState(
@@ -339,7 +373,302 @@ def test_cache_json(tmp_path: Path):
     assert state2["etag"] == state2.etag
     assert state2["cache_control"] == state2.cache_control
 
+    # unchanged state is not rewritten
+    written = cache_state.read_text()
+    inode = cache_state.stat().st_ino
+    assert state2.save() == len(written)
+    assert RepodataState(cache_json, cache_state, dict=dict(state2)).save() == len(
+        written
+    )
+    assert cache_state.stat().st_ino == inode
+
     cache_json.write_text("{ }")  # now invalid due to size
 
     state_invalid = RepodataState(cache_json, cache_state, "repodata.json").load()
     assert state_invalid.get("mod") == ""
+
+
+@pytest.mark.parametrize("use_zst", [True, False])
+def test_repodata_zst(
+    package_server: socket, package_repository_base: Path, use_zst: bool
+):
+    """CondaRepoInterface prefers repodata.json.zst, falling back to .json."""
+    zstandard = pytest.importorskip("zstandard")
+
+    host, port = package_server.getsockname()
+    subdir = f"zst-{use_zst}"
+    repodata_path = package_repository_base / subdir / "repodata.json"
+    repodata_path.parent.mkdir()
+    shutil.copy(package_repository_base / "osx-64" / "repodata.json", repodata_path)
+    expected = repodata_path.read_text()
+
+    repo = CondaRepoInterface(
+        f"http://{host}:{port}/test/{subdir}", repodata_fn="repodata.json"
+    )
+
+    with env_vars(
+        {"CONDA_REPODATA_USE_ZST": str(use_zst)},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        # .zst not found; remember that it is unavailable
+        state = RepodataState()
+        assert repo.repodata(state) == expected
+        assert state.get("has_zst", {}).get("value") is (False if use_zst else None)
+
+        Path(f"{repodata_path}.zst").write_bytes(
+            zstandard.ZstdCompressor().compress(repodata_path.read_bytes())
+        )
+
+        # don't look for .zst again until CHECK_ALTERNATE_FORMAT_INTERVAL
+        state.etag = state.mod = ""
+        assert repo.repodata(state) == expected
+        assert state.get("has_zst", {}).get("value") is (False if use_zst else None)
+
+        state.clear_has_format("zst")
+        state.etag = state.mod = ""
+        assert repo.repodata(state) == expected
+        assert state.get("has_zst", {}).get("value") is (True if use_zst else None)
+
+        # conditional headers apply to whichever variant was downloaded
+        with pytest.raises(Response304ContentUnchanged):
+            repo.repodata(state)
+
+
+@pytest.mark.parametrize("truncate", [True, False])
+def test_repodata_zst_frames(tmp_path: Path, mocker, truncate: bool):
+    """Every .zst frame is decompressed; a truncated body is not cached."""
+    zstandard = pytest.importorskip("zstandard")
+
+    repodata = b'{"info": {"subdir": "noarch"}, "packages": {}}'
+    compressor = zstandard.ZstdCompressor()
+    body = compressor.compress(repodata[:20]) + compressor.compress(repodata[20:])
+    if truncate:
+        body = body[: len(body) - 5]
+
+    response = Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.url = "https://repo.example/noarch/repodata.json.zst"
+    mocker.patch.object(CondaRepoInterface, "_get", return_value=response)
+
+    cache_path_json = tmp_path / "repodata.json"
+    repo = CondaRepoInterface(
+        "https://repo.example/noarch",
+        repodata_fn="repodata.json",
+        cache_path_json=cache_path_json,
+        cache_path_state=tmp_path / "repodata.state.json",
+    )
+    state = RepodataState()
+    with env_vars(
+        {"CONDA_REPODATA_USE_ZST": "true"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ):
+        if truncate:
+            with pytest.raises(CondaHTTPError):
+                repo.repodata(state)
+            assert not cache_path_json.exists()
+            assert not list(tmp_path.iterdir())
+        else:
+            with pytest.raises(RepodataOnDisk):
+                repo.repodata(state)
+            assert cache_path_json.read_bytes() == repodata
+
+
+def test_repodata_utf8(tmp_path: Path, mocker):
+    """Repodata is decoded as UTF-8 without guessing its encoding."""
+    repodata = '{"info": {"description": "caf\u00e9"}}'
+    (tmp_path / "repodata.json").write_bytes(repodata.encode("utf-8"))
+
+    # file:// responses have no encoding; response.text would guess it
+    mocker.patch(
+        "conda.gateways.connection.Response.apparent_encoding",
+        new_callable=mocker.PropertyMock,
+        side_effect=AssertionError("encoding guessed"),
+    )
+
+    repo = CondaRepoInterface(tmp_path.as_uri(), repodata_fn="repodata.json")
+    assert repo.repodata(RepodataState()) == repodata
+
+
+def test_repodata_on_disk(tmp_path: Path):
+    """Repodata is streamed into cache_path_json instead of returned."""
+    repodata = b'{"info": {"subdir": "noarch"}, "packages": {}}'
+    (tmp_path / "repodata.json").write_bytes(repodata)
+
+    cache_path_json = tmp_path / "cache" / "repodata.json"
+    repo = CondaRepoInterface(
+        tmp_path.as_uri(),
+        repodata_fn="repodata.json",
+        cache_path_json=cache_path_json,
+        cache_path_state=cache_path_json.with_suffix(".state.json"),
+    )
+
+    state = RepodataState()
+    with pytest.raises(RepodataOnDisk) as excinfo:
+        repo.repodata(state)
+    assert excinfo.value.state_saved
+    assert cache_path_json.read_bytes() == repodata
+    assert state["_url"] == tmp_path.as_uri()
+    # no stray temporary files
+    assert sorted(path.name for path in cache_path_json.parent.iterdir()) == [
+        "repodata.json",
+        "repodata.state.json",
+    ]
+
+    # .state.json was written with the new file's mtime and size
+    saved = json.loads(cache_path_json.with_suffix(".state.json").read_text())
+    stat = cache_path_json.stat()
+    assert saved["mtime_ns"] == stat.st_mtime_ns
+    assert saved["size"] == stat.st_size == len(repodata)
+    assert saved["url"] == tmp_path.as_uri()
+
+
+def test_repodata_on_disk_state_path(tmp_path: Path):
+    """State is saved to the cache_path_state the interface was given."""
+    (tmp_path / "repodata.json").write_text("{}")
+
+    cache_path_json = tmp_path / "cache" / "abc1.json"
+    cache_path_state = tmp_path / "cache" / "elsewhere.state.json"
+    repo = CondaRepoInterface(
+        tmp_path.as_uri(),
+        repodata_fn="repodata.json",
+        cache_path_json=cache_path_json,
+        cache_path_state=cache_path_state,
+    )
+    with env_vars(
+        {"CONDA_USE_ONLY_TAR_BZ2": "true"},
+        stack_callback=conda_tests_ctxt_mgmt_def_pol,
+    ), pytest.raises(RepodataOnDisk):
+        repo.repodata(RepodataState())
+
+    assert sorted(path.name for path in cache_path_json.parent.iterdir()) == [
+        "abc1.json",
+        "elsewhere.state.json",
+    ]
+    saved = json.loads(cache_path_state.read_text())
+    assert saved["size"] == cache_path_json.stat().st_size
+
+
+@pytest.mark.parametrize("status_code", [304, 404, 500])
+def test_repodata_releases_connection(tmp_path: Path, mocker, status_code: int):
+    """Responses without repodata give their connection back to the pool."""
+    raw = io.BytesIO(b"")
+    raw.release_conn = mocker.Mock()
+    raw.close = mocker.Mock()
+    response = Response()
+    response.status_code = status_code
+    response.raw = raw
+    response.url = "https://repo.example/noarch/repodata.json"
+    mocker.patch.object(CondaRepoInterface, "_get", return_value=response)
+
+    repo = CondaRepoInterface("https://repo.example/noarch", "repodata.json")
+    with pytest.raises(Exception):
+        repo.repodata(RepodataState())
+
+    raw.release_conn.assert_called()
+    # closing raw before the body was read would drop the connection
+    raw.close.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "last_modified,expected",
+    [
+        ("Sun, 06 Nov 1994 08:49:37 GMT", "Sun, 06 Nov 1994 08:49:37 GMT"),
+        # obsolete RFC 850 format
+        ("Sunday, 06-Nov-94 08:49:37 GMT", "Sun, 06 Nov 1994 08:49:37 GMT"),
+        ("Sun, 06 Nov 1994 09:49:37 +0100", "Sun, 06 Nov 1994 08:49:37 GMT"),
+        ("not a date", ""),
+    ],
+)
+def test_last_modified_parsed(last_modified: str, expected: str):
+    """Last-Modified is normalized to an HTTP-date for If-Modified-Since."""
+    response = Response()
+    response.headers["Last-Modified"] = last_modified
+    state = RepodataState()
+    _add_http_value_to_dict(response, "Last-Modified", state, "_mod")
+    assert state.mod == last_modified
+    assert _http_date(state.mod) == expected
+
+
+def test_if_modified_since(mocker):
+    """If-Modified-Since follows state.mod however it was set, e.g. by jlap."""
+    response = Response()
+    response.status_code = 304
+    response.raw = io.BytesIO(b"")
+    get = mocker.patch.object(CondaRepoInterface, "_get", return_value=response)
+
+    repo = CondaRepoInterface("https://repo.example/noarch", "repodata.json")
+    state = RepodataState()
+    state["_mod"] = "Sunday, 06-Nov-94 08:49:37 GMT"
+    with pytest.raises(Response304ContentUnchanged):
+        repo.repodata(state)
+    headers = get.call_args[0][1]
+    assert headers["If-Modified-Since"] == "Sun, 06 Nov 1994 08:49:37 GMT"
+
+    state.mod = "not a date"
+    with pytest.raises(Response304ContentUnchanged):
+        repo.repodata(state)
+    headers = get.call_args[0][1]
+    assert headers["If-Modified-Since"] == "not a date"
+
+
+@pytest.mark.parametrize(
+    "status_code,url,expected",
+    [
+        (401, "https://conda.anaconda.org/t/tk-123/conda-forge/noarch", "auth_token"),
+        (401, "https://conda.anaconda.org/conda-forge/noarch", "auth_alias"),
+        (401, "https://example.com/channel/noarch", "auth"),
+        (503, "https://example.com/channel/noarch", "5xx"),
+        (418, "https://repo.anaconda.com/pkgs/main/noarch", "repo_anaconda"),
+        (None, "https://example.com/channel/noarch", "generic"),
+    ],
+)
+def test_classify_http_error(status_code, url, expected):
+    assert _classify_http_error(status_code, url) == expected
+
+
+def test_repodata_concurrent_fetches(mocker):
+    """Concurrent fetches of the same repodata share one download."""
+    started = threading.Event()
+    waiting = threading.Event()
+    release = threading.Event()
+
+    class Future(concurrent.futures.Future):
+        def result(self, timeout=None):
+            waiting.set()
+            return super().result(timeout)
+
+    mocker.patch("conda.gateways.repodata.Future", Future)
+
+    def fetch(state):
+        started.set()
+        release.wait(10)
+        state.etag = "shared"
+        return "{}"
+
+    _repodata = mocker.patch.object(
+        CondaRepoInterface,
+        "_repodata",
+        autospec=True,
+        side_effect=lambda _, state: fetch(state),
+    )
+    repo = CondaRepoInterface("https://example.com/channel/noarch", "repodata.json")
+
+    results = {}
+
+    def load(name):
+        state = RepodataState()
+        results[name] = (repo.repodata(state), state.etag)
+
+    leader = threading.Thread(target=load, args=("leader",))
+    leader.start()
+    assert started.wait(10)
+    follower = threading.Thread(target=load, args=("follower",))
+    follower.start()
+    assert waiting.wait(10)
+    release.set()
+    leader.join(10)
+    follower.join(10)
+
+    assert _repodata.call_count == 1
+    assert results == {"leader": ("{}", "shared"), "follower": ("{}", "shared")}
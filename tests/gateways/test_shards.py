@@ -0,0 +1,161 @@
+# Copyright (C) 2012 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Test that ShardedRepoInterface assembles repodata from CEP-16 shards.
+"""
+import hashlib
+import json
+from pathlib import Path
+from socket import socket
+
+import pytest
+
+from conda.gateways.repodata import (
+    RepodataOnDisk,
+    RepodataState,
+    Response304ContentUnchanged,
+)
+
+msgpack = pytest.importorskip("msgpack")
+zstandard = pytest.importorskip("zstandard")
+
+from conda.gateways.repodata import shards  # noqa: E402
+
+
+def make_sharded_repo(repodata: dict, destination: Path):
+    """Write repodata_shards.msgpack.zst and shards/ into destination."""
+    compressor = zstandard.ZstdCompressor()
+    (destination / "shards").mkdir(parents=True)
+
+    by_name = {}
+    for key in ("packages", "packages.conda"):
+        for fn, record in repodata.get(key, {}).items():
+            record = dict(record)
+            for hash_key in ("md5", "sha256"):
+                if hash_key in record:
+                    record[hash_key] = bytes.fromhex(record[hash_key])
+            by_name.setdefault(record["name"], {"packages": {}, "packages.conda": {}})
+            by_name[record["name"]][key][fn] = record
+
+    index = {"version": 1, "info": repodata["info"], "shards": {}}
+    for name, shard in by_name.items():
+        data = compressor.compress(msgpack.packb(shard))
+        digest = hashlib.sha256(data).digest()
+        (destination / "shards" / f"{digest.hex()}.msgpack.zst").write_bytes(data)
+        index["shards"][name] = digest
+
+    (destination / shards.SHARDS_INDEX_FN).write_bytes(
+        compressor.compress(msgpack.packb(index))
+    )
+
+
+def test_sharded_repodata(
+    package_server: socket, package_repository_base: Path, tmp_path: Path
+):
+    host, port = package_server.getsockname()
+    repodata = json.loads(
+        (package_repository_base / "osx-64" / "repodata.json").read_text()
+    )
+    make_sharded_repo(repodata, package_repository_base / "sharded-64")
+
+    repo = shards.ShardedRepoInterface(
+        f"http://{host}:{port}/test/sharded-64",
+        repodata_fn="repodata.json",
+        cache_path_json=tmp_path / "repodata.json",
+        cache_path_state=tmp_path / "repodata.state.json",
+    )
+
+    state = RepodataState()
+    sharded = repo.repodata(state)
+    assert isinstance(sharded, shards.ShardedRepodata)
+    assert state.has_format("shards")[0] is True
+    assert state.etag
+
+    assert sharded.names == ["zlib"]
+    assert sharded.shard("zlib")["packages"]
+    assert dict(sharded) == {
+        "info": repodata["info"],
+        "packages": repodata["packages"],
+        "packages.conda": repodata["packages.conda"],
+    }
+
+    # content-addressed shards are cached
+    assert len(list((tmp_path / "shards").glob("*.msgpack.zst"))) == 1
+
+    with pytest.raises(Response304ContentUnchanged):
+        repo.repodata(state)
+
+    # fall back to repodata.json for channels without shards
+    repo = shards.ShardedRepoInterface(
+        f"http://{host}:{port}/test/osx-64", repodata_fn="repodata.json"
+    )
+    state = RepodataState()
+    assert json.loads(repo.repodata(state)) == repodata
+    assert state.has_format("shards")[0] is False
+
+
+def test_sharded_repodata_too_many_missing(
+    package_server: socket, package_repository_base: Path, tmp_path: Path, mocker
+):
+    """Use repodata.json while each load caches a few more missing shards."""
+    host, port = package_server.getsockname()
+    repodata = json.loads(
+        (package_repository_base / "osx-64" / "repodata.json").read_text()
+    )
+    (fn, record), *_ = repodata["packages"].items()
+    repodata["packages"] = {
+        f"{name}-{fn}": {**record, "name": name} for name in ("a", "b", "c")
+    }
+    repodata["packages.conda"] = {}
+    repodata_text = json.dumps(repodata)
+    destination = package_repository_base / "sharded-gate-64"
+    make_sharded_repo(repodata, destination)
+    (destination / "repodata.json").write_text(repodata_text)
+    mocker.patch.object(shards, "MAX_SHARD_FETCHES", 2)
+
+    repo = shards.ShardedRepoInterface(
+        f"http://{host}:{port}/test/sharded-gate-64",
+        repodata_fn="repodata.json",
+        cache_path_json=tmp_path / "repodata.json",
+        cache_path_state=tmp_path / "repodata.state.json",
+    )
+    state = RepodataState()
+    with pytest.raises(RepodataOnDisk):
+        repo.repodata(state)
+    assert (tmp_path / "repodata.json").read_text() == repodata_text
+    assert state.has_format("shards")[0] is True
+    assert len(list((tmp_path / "shards").glob("*.msgpack.zst"))) == 2
+
+    # the last shard fits; use shards from now on
+    sharded = repo.repodata(state)
+    assert isinstance(sharded, shards.ShardedRepodata)
+    assert sharded["packages"] == repodata["packages"]
+    assert len(list((tmp_path / "shards").glob("*.msgpack.zst"))) == 3
+
+
+@pytest.mark.parametrize("corrupt", [True, False])
+def test_sharded_repodata_bad_shard(
+    package_server: socket,
+    package_repository_base: Path,
+    tmp_path: Path,
+    corrupt: bool,
+):
+    """Unusable shards raise ShardError while fetching, not an empty channel."""
+    host, port = package_server.getsockname()
+    repodata = json.loads(
+        (package_repository_base / "osx-64" / "repodata.json").read_text()
+    )
+    subdir = f"sharded-bad-{corrupt}"
+    make_sharded_repo(repodata, package_repository_base / subdir)
+    (shard,) = (package_repository_base / subdir / "shards").iterdir()
+    if corrupt:
+        shard.write_bytes(b"not the shard")
+    else:
+        shard.unlink()
+
+    repo = shards.ShardedRepoInterface(
+        f"http://{host}:{port}/test/{subdir}", repodata_fn="repodata.json"
+    )
+    match = "sha256" if corrupt else "HTTP 404"
+    with pytest.raises(shards.ShardError, match=match):
+        repo.repodata(RepodataState())